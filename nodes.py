@@ -2,22 +2,36 @@
 # -*- coding: utf-8 -*-
 
 import os
-import math
+import functools
+import contextlib
 import torch
 import folder_paths
 import comfy.utils
+import comfy.model_management
 
 import numpy as np
 import torch.nn.functional as F
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from einops import rearrange
-from huggingface_hub import snapshot_download
+from huggingface_hub import snapshot_download, hf_hub_download
+from huggingface_hub import constants as hf_constants
 from .src import ModelManager, FlashVSRFullPipeline, FlashVSRTinyPipeline, FlashVSRTinyLongPipeline
 from .src.models.TCDecoder import build_tcdecoder
 from .src.models.utils import clean_vram, Buffer_LQ4x_Proj
 from .src.models import wan_video_dit
 
+# Use the multi-connection Rust downloader when it is installed, unless the user chose otherwise.
+try:
+    import hf_transfer  # noqa: F401
+    if "HF_HUB_ENABLE_HF_TRANSFER" not in os.environ:
+        os.environ["HF_HUB_ENABLE_HF_TRANSFER"] = "1"
+        hf_constants.HF_HUB_ENABLE_HF_TRANSFER = True
+except ImportError:
+    pass
+
 def get_device_list():
     devs = ["auto"]
     try:
@@ -51,12 +65,13 @@ def model_downlod(model_name="JunhaoZhuang/FlashVSR"):
     model_dir = os.path.join(folder_paths.models_dir, "FlashVSR")
     if not os.path.exists(model_dir):
         log(f"Downloading model '{model_name}' from huggingface...", message_type='info')
-        snapshot_download(repo_id=model_name, local_dir=model_dir, local_dir_use_symlinks=False, resume_download=True)
+        snapshot_download(repo_id=model_name, local_dir=model_dir, local_dir_use_symlinks=False, resume_download=True, max_workers=8)
 
-def tensor2video(frames: torch.Tensor):
+def tensor2video(frames: torch.Tensor, channels_first: bool = False):
     video_squeezed = frames.squeeze(0)
-    video_permuted = rearrange(video_squeezed, "C F H W -> F H W C")
-    video_final = (video_permuted.float() + 1.0) / 2.0
+    video_permuted = rearrange(video_squeezed, "C F H W -> F C H W" if channels_first else "C F H W -> F H W C")
+    # [-1, 1] -> [0, 1] as one in-place pass; copy=True keeps a float32 input from being modified
+    video_final = video_permuted.to(torch.float32, copy=True).mul_(0.5).add_(0.5)
     return video_final
 
 def largest_8n1_leq(n):  # 8n+1
@@ -72,20 +87,27 @@ def compute_scaled_and_target_dims(w0: int, h0: int, scale: int = 4, multiple: i
     return sW, sH, tW, tH
 
 def tensor_upscale_then_center_crop(frame_tensor: torch.Tensor, scale: int, tW: int, tH: int) -> torch.Tensor:
-    h0, w0, c = frame_tensor.shape
-    tensor_bchw = frame_tensor.permute(2, 0, 1).unsqueeze(0) # HWC -> CHW -> BCHW
+    """(N, H, W, C) frames -> (C, N, tH, tW), the channel/frame order of the LQ video."""
+    n, h0, w0, c = frame_tensor.shape
     
     sW, sH = w0 * scale, h0 * scale
-    upscaled_tensor = F.interpolate(tensor_bchw, size=(sH, sW), mode='bicubic', align_corners=False)
+    # Bicubic resampling works per plane, so channels can act as the batch and frames as the
+    # channels: one permute of the small input and the output already comes out as (C, N).
+    # Integer frames are resampled in float since bicubic has no uint8 kernel on the GPU.
+    tensor_cnhw = frame_tensor.permute(3, 0, 1, 2).contiguous().float() # NHWC -> CNHW
+    upscaled_tensor = F.interpolate(tensor_cnhw, size=(sH, sW), mode='bicubic', align_corners=False)
     
     l = max(0, (sW - tW) // 2)
     t = max(0, (sH - tH) // 2)
     cropped_tensor = upscaled_tensor[:, :, t:t + tH, l:l + tW]
+    
+    if frame_tensor.dtype == torch.uint8:
+        cropped_tensor = cropped_tensor.float().div_(255.0)
 
-    return cropped_tensor.squeeze(0)
+    return cropped_tensor
 
-def prepare_input_tensor(image_tensor: torch.Tensor, device, scale: int = 4, dtype=torch.bfloat16):
-    N0, h0, w0, _ = image_tensor.shape
+def prepare_input_tensor(image_tensor: torch.Tensor, device, scale: int = 4, dtype=torch.bfloat16, keep_on_device: bool = False, chunk_size=None, chunk_bytes: int = 256 * 1024 ** 2):
+    N0, h0, w0, C = image_tensor.shape
     
     multiple = 128
     sW, sH, tW, tH = compute_scaled_and_target_dims(w0, h0, scale=scale, multiple=multiple)
@@ -95,92 +117,265 @@ def prepare_input_tensor(image_tensor: torch.Tensor, device, scale: int = 4, dty
     if F == 0:
         raise RuntimeError(f"Not enough frames after padding. Got {num_frames_with_padding}.")
     
-    frames = []
-    for i in range(F):
-        frame_idx = min(i, N0 - 1)
-        frame_slice = image_tensor[frame_idx].to(device)
-        tensor_chw = tensor_upscale_then_center_crop(frame_slice, scale=scale, tW=tW, tH=tH)
-        tensor_out = tensor_chw * 2.0 - 1.0
-        tensor_out = tensor_out.to('cpu').to(dtype)
-        frames.append(tensor_out)
-
-    vid_stacked = torch.stack(frames, 0)
-    vid_final = vid_stacked.permute(1, 0, 2, 3).unsqueeze(0)
-    
-    del vid_stacked
-    clean_vram()
+    # "tiny-long" streams LQ windows to the device itself, so it is staged on CPU.
+    vid_final = torch.empty((1, C, F, tH, tW), device=device if keep_on_device else 'cpu', dtype=dtype)
+
+    if chunk_size is None:
+        if keep_on_device:
+            # Each frame in flight holds a float32 upscale plus its cast copy; batch as many as fit the budget.
+            frame_bytes = C * sH * sW * 4 + C * tH * tW * vid_final.element_size()
+            chunk_size = max(1, chunk_bytes // frame_bytes)
+        else:
+            # "tiny-long" is the low-VRAM mode, keep the device peak at a single frame like before.
+            chunk_size = 1
+
+    # Upscale several frames per interpolate call; chunking bounds the float32 peak on device.
+    for start in range(0, F, chunk_size):
+        end = min(start + chunk_size, F)
+        # Copy only the distinct source frames and replicate the trailing padding frames on the device.
+        lo, hi = min(start, N0 - 1), min(end, N0)
+        idx = torch.arange(start, end).clamp_(max=N0 - 1) - lo
+        frame_batch = image_tensor[lo:hi].to(device, non_blocking=image_tensor.is_pinned())[idx]
+        tensor_cnhw = tensor_upscale_then_center_crop(frame_batch, scale=scale, tW=tW, tH=tH)
+        tensor_out = tensor_cnhw.mul_(2.0).sub_(1.0)
+        if not keep_on_device:
+            # cast before leaving the device so only dtype-sized bytes cross PCIe
+            tensor_out = tensor_out.to(dtype)
+        # copy_ casts straight into the preallocated buffer, which already has the (C, N) order
+        vid_final[0, :, start:end].copy_(tensor_out)
+        del frame_batch, tensor_cnhw, tensor_out
     
     return vid_final, tH, tW, F
 
 def calculate_tile_coords(height, width, tile_size, overlap):
-    coords = []
-    
     stride = tile_size - overlap
-    num_rows = math.ceil((height - overlap) / stride)
-    num_cols = math.ceil((width - overlap) / stride)
+    num_rows = max(0, -(-(height - overlap) // stride))
+    num_cols = max(0, -(-(width - overlap) // stride))
     
-    for r in range(num_rows):
-        for c in range(num_cols):
-            y1 = r * stride
-            x1 = c * stride
-            
-            y2 = min(y1 + tile_size, height)
-            x2 = min(x1 + tile_size, width)
-            
-            if y2 - y1 < tile_size:
-                y1 = max(0, y2 - tile_size)
-            if x2 - x1 < tile_size:
-                x1 = max(0, x2 - tile_size)
-                
-            coords.append((x1, y1, x2, y2))
-            
-    return coords
-
-def create_feather_mask(size, overlap):
-    H, W = size
-    mask = torch.ones(1, 1, H, W)
-    ramp = torch.linspace(0, 1, overlap)
+    ys = np.arange(num_rows) * stride
+    xs = np.arange(num_cols) * stride
+    yy, xx = np.meshgrid(ys, xs, indexing='ij')
     
-    mask[:, :, :, :overlap] = torch.minimum(mask[:, :, :, :overlap], ramp.view(1, 1, 1, -1))
-    mask[:, :, :, -overlap:] = torch.minimum(mask[:, :, :, -overlap:], ramp.flip(0).view(1, 1, 1, -1))
+    # Edge tiles are shifted back inside the frame so every tile keeps the full tile_size.
+    y2 = np.minimum(yy + tile_size, height)
+    x2 = np.minimum(xx + tile_size, width)
+    y1 = np.maximum(0, y2 - tile_size)
+    x1 = np.maximum(0, x2 - tile_size)
     
-    mask[:, :, :overlap, :] = torch.minimum(mask[:, :, :overlap, :], ramp.view(1, 1, -1, 1))
-    mask[:, :, -overlap:, :] = torch.minimum(mask[:, :, -overlap:, :], ramp.flip(0).view(1, 1, -1, 1))
+    # (num_tiles, 4) array of (x1, y1, x2, y2), row-major over the tile grid
+    return np.stack([x1, y1, x2, y2], axis=-1).reshape(-1, 4)
+
+def prefetch_tile(frames: torch.Tensor, coords, device, copy_stream=None):
+    x1, y1, x2, y2 = coords
+    tile = frames[:, y1:y2, x1:x2, :]
+    if copy_stream is None:
+        return tile, None
     
+    # Stage the tile in pinned memory so the H2D copy can run on copy_stream while the
+    # previous tile is still being processed on the compute stream.
+    with torch.cuda.stream(copy_stream):
+        staging = torch.empty(tile.shape, dtype=tile.dtype, pin_memory=True)
+        staging.copy_(tile)
+        tile = staging.to(device, non_blocking=True)
+        ready = torch.cuda.Event()
+        ready.record(copy_stream)
+    return tile, ready
+
+@functools.lru_cache(maxsize=32)
+def feather_ramp(length, overlap, feather_start=True, feather_end=True):
+    ramp = torch.ones(length)
+    # Sides that touch the frame border have no neighbouring tile to blend with and stay at full weight.
+    if overlap > 0:
+        edge = torch.linspace(0, 1, overlap)
+        if feather_start:
+            ramp[:overlap] = edge
+        if feather_end:
+            ramp[-overlap:] = torch.minimum(ramp[-overlap:], edge.flip(0))
+    return ramp
+
+def create_feather_mask(size, overlap, feather_left=True, feather_right=True, feather_top=True, feather_bottom=True, dtype=torch.float32):
+    H, W = size
+    # Only the 1D ramps are cached (shared between tiles, callers must not modify them in place);
+    # the full mask is a single outer product built directly in the accumulation dtype.
+    rx = feather_ramp(W, overlap, feather_left, feather_right).to(dtype)
+    ry = feather_ramp(H, overlap, feather_top, feather_bottom).to(dtype)
+    mask = (ry[:, None] * rx[None, :])[None, None]
     return mask
 
+@contextlib.contextmanager
+def cudnn_autotune(enabled=True):
+    previous = torch.backends.cudnn.benchmark
+    torch.backends.cudnn.benchmark = enabled or previous
+    try:
+        yield
+    finally:
+        torch.backends.cudnn.benchmark = previous
+
+class RangeNotSupported(RuntimeError):
+    pass
+
+def parse_hf_url(url):
+    """Split a huggingface.co ".../resolve/<revision>/<file>" URL into (repo_id, revision, filename)."""
+    prefix = "https://huggingface.co/"
+    if not url.startswith(prefix) or "/resolve/" not in url:
+        return None
+    repo_id, _, rest = url[len(prefix):].partition("/resolve/")
+    revision, _, filename = rest.partition("/")
+    if not repo_id or not revision or not filename:
+        return None
+    return repo_id, revision, filename
+
+def download_to_file(url, temp_path, desc, timeout=None, num_workers=8, part_size=16 * 1024 * 1024):
+    """下载 url 到 temp_path；服务器支持 Range 时按 16MB 分段并行下载，否则单连接下载"""
+    chunk_size = 1024 * 1024  # 1MB chunks
+
+    try:
+        head = requests.head(url, allow_redirects=True, timeout=timeout)
+        head.raise_for_status()
+        # Reuse the redirect target (CDN) so every part request skips the redirect hop
+        final_url = head.url
+        total_size = int(head.headers.get('content-length', 0))
+        accept_ranges = head.headers.get('accept-ranges', '').lower() == 'bytes'
+    except requests.exceptions.HTTPError:
+        # Some servers reject HEAD; a plain GET still works
+        final_url, total_size, accept_ranges = url, 0, False
+
+    # Finished part offsets of a ranged download; its presence also marks temp_path as preallocated
+    parts_path = f"{temp_path}.parts"
+
+    with tqdm(
+        desc=desc,
+        total=total_size,
+        unit='B',
+        unit_scale=True,
+        unit_divisor=1024,
+    ) as bar:
+        if accept_ranges and total_size > part_size:
+            parts = [(start, min(start + part_size, total_size) - 1) for start in range(0, total_size, part_size)]
+            existing_size = os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+            done = set()
+            if os.path.exists(parts_path):
+                with open(parts_path) as file:
+                    lines = file.read().splitlines()
+                if existing_size == total_size and lines and lines[0] == str(total_size):
+                    done = {int(line) for line in lines[1:] if line.isdigit()}
+            elif existing_size <= total_size:
+                # Left over by a single connection download: every part inside the prefix is complete
+                done = {start for start, end in parts if end < existing_size}
+            done &= {start for start, _ in parts}
+
+            if done:
+                print(f"Resume download: {len(done)}/{len(parts)} parts already done")
+                with open(temp_path, 'r+b') as file:
+                    file.truncate(total_size)
+            else:
+                with open(temp_path, 'wb') as file:
+                    file.truncate(total_size)
+            with open(parts_path, 'w') as file:
+                file.write("".join(f"{line}\n" for line in [total_size, *sorted(done)]))
+            bar.update(sum(end - start + 1 for start, end in parts if start in done))
+
+            # Set on the first failed part so the other workers stop instead of finishing their ranges
+            stop = threading.Event()
+            parts_lock = threading.Lock()
+
+            def fetch_part(start, end):
+                if stop.is_set():
+                    return
+                headers = {"Range": f"bytes={start}-{end}"}
+                with requests.get(final_url, headers=headers, stream=True, timeout=timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise RangeNotSupported(f"Server answered {response.status_code} to a Range request")
+                    # Each worker writes its own byte range through a separate handle
+                    written = 0
+                    with open(temp_path, 'r+b') as file:
+                        file.seek(start)
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if stop.is_set():
+                                return
+                            if chunk:
+                                size = file.write(chunk)
+                                written += size
+                                bar.update(size)
+                    if written != end - start + 1:
+                        raise IOError(f"Incomplete range {start}-{end}: got {written} bytes")
+                with parts_lock, open(parts_path, 'a') as file:
+                    file.write(f"{start}\n")
+
+            try:
+                executor = ThreadPoolExecutor(max_workers=num_workers)
+                try:
+                    futures = [executor.submit(fetch_part, start, end) for start, end in parts if start not in done]
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    stop.set()
+                    raise
+                finally:
+                    # drop the parts that have not started yet; running ones exit at their next chunk
+                    executor.shutdown(wait=True, cancel_futures=True)
+                os.remove(parts_path)
+                return
+            except RangeNotSupported as e:
+                print(f"{e}, fall back to single connection download")
+                bar.reset()
+
+        if os.path.exists(parts_path):
+            # A preallocated ranged download is not a usable prefix, start over
+            os.remove(parts_path)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        resume_from = os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+        if total_size and resume_from == total_size:
+            bar.update(resume_from)
+            return
+        if total_size and resume_from > total_size:
+            resume_from = 0
+
+        headers = {"Range": f"bytes={resume_from}-"} if resume_from else None
+        response = requests.get(final_url, headers=headers, stream=True, timeout=timeout)
+        if response.status_code == 416:
+            # The server rejects the resume offset; download the whole file again
+            response.close()
+            resume_from = 0
+            response = requests.get(final_url, stream=True, timeout=timeout)
+        with response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                # Range header ignored, the body is the whole file
+                resume_from = 0
+            if not bar.total:
+                bar.total = resume_from + int(response.headers.get('content-length', 0))
+            bar.update(resume_from)
+            with open(temp_path, 'ab' if resume_from else 'wb') as file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        size = file.write(chunk)
+                        bar.update(size)
+
 def download_file(main_url, backup_url, save_path):
     """首先尝试从主URL下载，如果超时则使用备用URL"""
     print(f"Try download file: {os.path.basename(save_path)} 从 {main_url}")
 
+    # A leftover .partial file is resumed by download_to_file
     temp_path = f"{save_path}.partial"
-    if os.path.exists(temp_path):
-        print(f"Delete partial file: {temp_path}")
-        try:
-            os.remove(temp_path)
-        except Exception as e:
-            print(f"Delete partial file failed: {str(e)}")
     # 设置超时时间（秒）
     timeout = 15
 
     try:
-        response = requests.get(main_url, stream=True, timeout=timeout)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-        chunk_size = 8192  # 8KB chunks
-
-        with open(temp_path, 'wb') as file, tqdm(
-            desc=f"Main URL - {os.path.basename(save_path)}",
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    size = file.write(chunk)
-                    bar.update(size)
+        hf_file = parse_hf_url(main_url)
+        if hf_file is not None:
+            # hf_hub_download picks up hf_transfer when it is enabled
+            repo_id, revision, filename = hf_file
+            downloaded_path = hf_hub_download(repo_id=repo_id, filename=filename, revision=revision, local_dir=os.path.dirname(save_path))
+            if os.path.abspath(downloaded_path) != os.path.abspath(save_path):
+                os.replace(downloaded_path, save_path)
+            print(f"Download from {main_url} success, save to: {save_path}")
+            return True
+
+        download_to_file(main_url, temp_path, f"Main URL - {os.path.basename(save_path)}", timeout=timeout)
         if os.path.exists(temp_path):
             if os.path.exists(save_path):
                 os.remove(save_path)
@@ -190,20 +385,6 @@ def download_file(main_url, backup_url, save_path):
             raise RuntimeError("Download from main URL failed, temp file not exist")
 
         return True
-    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-        print(f"Download from {main_url} timeout or connection error, try backup URL")
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-    except Exception as e:
-        print(f"Download from {main_url} failed: {str(e)}")
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
     except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
         print(f"Download from {main_url} timeout or connection error, try backup URL")
     except Exception as e:
@@ -212,23 +393,7 @@ def download_file(main_url, backup_url, save_path):
     # 如果主URL失败，尝试备用URL
     print(f"Try download file: {os.path.basename(save_path)} 从 {backup_url}")
     try:
-        response = requests.get(backup_url, stream=True)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-        chunk_size = 8192  # 8KB chunks
-
-        with open(temp_path, 'wb') as file, tqdm(
-            desc=f"Backup URL - {os.path.basename(save_path)}",
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    size = file.write(chunk)
-                    bar.update(size)
+        download_to_file(backup_url, temp_path, f"Backup URL - {os.path.basename(save_path)}", timeout=timeout)
 
         if os.path.exists(temp_path):
             if os.path.exists(save_path):
@@ -240,12 +405,8 @@ def download_file(main_url, backup_url, save_path):
 
         return True
     except Exception as e:
+        # Keep the .partial file so the next attempt resumes it
         print(f"Download from backup URL failed: {str(e)}")
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
         raise RuntimeError(f"Download {os.path.basename(save_path)} from backup URL failed: {str(e)}")
 
 def init_pipeline(mode, device, dtype):
@@ -325,6 +486,40 @@ def init_pipeline(mode, device, dtype):
     
     return pipe
 
+# Keep the most recently used pipeline resident (when "keep_model_loaded" is on) so re-running
+# the node skips reloading the weights.
+_PIPE_CACHE = {}
+
+def release_pipeline():
+    if _PIPE_CACHE:
+        _PIPE_CACHE.clear()
+        clean_vram()
+
+# ComfyUI's model management does not track this pipeline, so release it whenever ComfyUI
+# unloads its own models ("Unload Models" / "Free model and node cache", OOM recovery).
+# If this module is reloaded, wrap the original function again instead of the previous wrapper.
+_comfy_unload_all_models = getattr(comfy.model_management.unload_all_models, "_flashvsr_original", comfy.model_management.unload_all_models)
+
+def _unload_all_models(*args, **kwargs):
+    release_pipeline()
+    return _comfy_unload_all_models(*args, **kwargs)
+
+_unload_all_models._flashvsr_original = _comfy_unload_all_models
+comfy.model_management.unload_all_models = _unload_all_models
+
+def get_pipeline(mode, device, dtype):
+    key = (mode, device, dtype)
+    pipe = _PIPE_CACHE.get(key)
+    if pipe is None:
+        # only one pipeline fits comfortably in VRAM, drop the old one before loading
+        release_pipeline()
+        pipe = init_pipeline(mode, device, dtype)
+        _PIPE_CACHE[key] = pipe
+    elif pipe.dit is not None and next(pipe.dit.parameters()).is_cpu:
+        # a previous run with "unload_dit" left the DiT on the CPU
+        pipe.dit.to(pipe.device)
+    return pipe
+
 class cqdm:
     def __init__(self, iterable=None, total=None, desc="Processing"):
         self.desc = desc
@@ -460,6 +655,10 @@ class FlashVSRNode:
                     "default": "sparse_sage_attention",
                     "tooltip": '"sparse_sage_attention" is available for sm_75 to sm_120\n"block_sparse_attention" is available for sm_80 to sm_100'
                 }),
+                "keep_model_loaded": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Keep the FlashVSR weights in VRAM after the run so re-running the node skips reloading them.\nDisable to free the VRAM for downstream nodes."
+                }),
             }
         }
     
@@ -469,7 +668,15 @@ class FlashVSRNode:
     CATEGORY = "FlashVSR"
     DESCRIPTION = 'Download the entire "FlashVSR" folder with all the files inside it from "https://huggingface.co/JunhaoZhuang/FlashVSR" and put it in the "ComfyUI/models"'
     
-    def main(self, frames, mode, scale, color_fix, tiled_vae, tiled_dit, tile_size, tile_overlap, unload_dit, sparse_ratio, kv_ratio, local_range, seed, device, precision, attention_mode):
+    def main(self, **kwargs):
+        try:
+            return self.upscale(**kwargs)
+        finally:
+            # Also runs when the upscale fails or the user cancels (InterruptProcessingException).
+            if not kwargs.get("keep_model_loaded", False):
+                release_pipeline()
+    
+    def upscale(self, frames, mode, scale, color_fix, tiled_vae, tiled_dit, tile_size, tile_overlap, unload_dit, sparse_ratio, kv_ratio, local_range, seed, device, precision, attention_mode, keep_model_loaded=False):
         _device = device
         if device == "auto":
             _device = "cuda:0" if torch.cuda.is_available() else "mps" if torch.mps.is_available() else device
@@ -489,10 +696,8 @@ class FlashVSRNode:
         
         _frames = frames
         if frames.shape[0] < 21:
-            add = 21 - frames.shape[0]
-            last_frame = frames[-1:, :, :, :]
-            padding_frames = last_frame.repeat(add, 1, 1, 1)
-            _frames = torch.cat([frames, padding_frames], dim=0)
+            # replicate the last frame up to 21 frames with a single gather
+            _frames = frames[torch.arange(21).clamp_(max=frames.shape[0] - 1)]
             #raise ValueError(f"Number of frames must be at least 21, got {frames.shape[0]}")
         
         dtype_map = {
@@ -509,59 +714,87 @@ class FlashVSRNode:
             N, H, W, C = _frames.shape
             num_aligned_frames = largest_8n1_leq(N + 4) - 4
             
+            # Canvases stay NCHW so tiles and feather masks broadcast without layout changes.
+            # Accumulate in fp16: tiles are in [0, 1] and the weight sums stay O(1), so half the
+            # bandwidth is enough precision; the division at the end runs in float32.
+            canvas_dtype = torch.float16
             final_output_canvas = torch.zeros(
-                (num_aligned_frames, H * scale, W * scale, C), 
-                dtype=torch.float32, 
+                (num_aligned_frames, C, H * scale, W * scale), 
+                dtype=canvas_dtype, 
+                device="cpu"
+            )
+            # Feather weights are identical for every frame and channel, one plane is enough.
+            weight_sum_canvas = torch.zeros(
+                (1, 1, H * scale, W * scale), 
+                dtype=canvas_dtype, 
                 device="cpu"
             )
-            weight_sum_canvas = torch.zeros_like(final_output_canvas)
             tile_coords = calculate_tile_coords(H, W, tile_size, tile_overlap)
-            latent_tiles_cpu = []
             
-            pipe = init_pipeline(mode, _device, dtype)
+            # All tiles share one size: same pipe arguments, reused allocations and cuDNN algorithms.
+            _, _, tw, th = compute_scaled_and_target_dims(min(tile_size, W), min(tile_size, H), scale=scale)
+            pipe_kwargs = dict(
+                prompt="", negative_prompt="", cfg_scale=1.0, num_inference_steps=1, seed=seed, tiled=tiled_vae,
+                num_frames=largest_8n1_leq(N + 4), height=th, width=tw, is_full_block=False, if_buffer=True,
+                topk_ratio=sparse_ratio*768*1280/(th*tw), kv_ratio=kv_ratio, local_range=local_range,
+                color_fix=color_fix, unload_dit=unload_dit
+            )
+            
+            pipe = get_pipeline(mode, _device, dtype)
+            
+            copy_stream = torch.cuda.Stream(device=_device) if _device.startswith("cuda") else None
+            next_tile = prefetch_tile(_frames, tile_coords[0], _device, copy_stream) if len(tile_coords) > 0 else None
             
-            for i, (x1, y1, x2, y2) in enumerate(cqdm(tile_coords, desc="Processing Tiles")):
-                log(f"[FlashVSR] Processing tile {i+1}/{len(tile_coords)}: coords ({x1},{y1}) to ({x2},{y2})", message_type='info')
-                input_tile = _frames[:, y1:y2, x1:x2, :]
-                
-                LQ_tile, th, tw, F = prepare_input_tensor(input_tile, _device, scale=scale, dtype=dtype)
-                if "long" not in mode:
-                    LQ_tile = LQ_tile.to(_device)
-                
-                output_tile_gpu = pipe(
-                    prompt="", negative_prompt="", cfg_scale=1.0, num_inference_steps=1, seed=seed, tiled=tiled_vae,
-                    LQ_video=LQ_tile, num_frames=F, height=th, width=tw, is_full_block=False, if_buffer=True,
-                    topk_ratio=sparse_ratio*768*1280/(th*tw), kv_ratio=kv_ratio, local_range=local_range,
-                    color_fix=color_fix, unload_dit=unload_dit
-                )
-                
-                processed_tile_cpu = tensor2video(output_tile_gpu).to("cpu")
-                
-                mask_nchw = create_feather_mask(
-                    (processed_tile_cpu.shape[1], processed_tile_cpu.shape[2]),
-                    tile_overlap * scale
-                ).to("cpu")
-                mask_nhwc = mask_nchw.permute(0, 2, 3, 1)
-                out_x1, out_y1 = x1 * scale, y1 * scale
-                
-                tile_H_scaled = processed_tile_cpu.shape[1]
-                tile_W_scaled = processed_tile_cpu.shape[2]
-                out_x2, out_y2 = out_x1 + tile_W_scaled, out_y1 + tile_H_scaled
-                final_output_canvas[:, out_y1:out_y2, out_x1:out_x2, :] += processed_tile_cpu * mask_nhwc
-                weight_sum_canvas[:, out_y1:out_y2, out_x1:out_x2, :] += mask_nhwc
-                
-                del LQ_tile, output_tile_gpu, processed_tile_cpu, input_tile
+            with cudnn_autotune(_device.startswith("cuda")):
+                for i, (x1, y1, x2, y2) in enumerate(cqdm(tile_coords, desc="Processing Tiles")):
+                    log(f"[FlashVSR] Processing tile {i+1}/{len(tile_coords)}: coords ({x1},{y1}) to ({x2},{y2})", message_type='info')
+                    input_tile, tile_ready = next_tile
+                    if i + 1 < len(tile_coords):
+                        next_tile = prefetch_tile(_frames, tile_coords[i + 1], _device, copy_stream)
+                    if tile_ready is not None:
+                        compute_stream = torch.cuda.current_stream()
+                        compute_stream.wait_event(tile_ready)
+                        input_tile.record_stream(compute_stream)
+                    
+                    LQ_tile, _, _, _ = prepare_input_tensor(input_tile, _device, scale=scale, dtype=dtype, keep_on_device="long" not in mode)
+                    
+                    output_tile_gpu = pipe(LQ_video=LQ_tile, **pipe_kwargs)
+                    
+                    processed_tile_cpu = tensor2video(output_tile_gpu, channels_first=True).to("cpu", dtype=canvas_dtype)
+                    
+                    mask = create_feather_mask(
+                        (processed_tile_cpu.shape[2], processed_tile_cpu.shape[3]),
+                        tile_overlap * scale,
+                        feather_left=bool(x1 > 0), feather_right=bool(x2 < W),
+                        feather_top=bool(y1 > 0), feather_bottom=bool(y2 < H),
+                        dtype=canvas_dtype
+                    )
+                    out_x1, out_y1 = x1 * scale, y1 * scale
+                    
+                    tile_H_scaled = processed_tile_cpu.shape[2]
+                    tile_W_scaled = processed_tile_cpu.shape[3]
+                    out_x2, out_y2 = out_x1 + tile_W_scaled, out_y1 + tile_H_scaled
+                    final_output_canvas[:, :, out_y1:out_y2, out_x1:out_x2].addcmul_(processed_tile_cpu, mask)
+                    weight_sum_canvas[:, :, out_y1:out_y2, out_x1:out_x2].add_(mask)
+                    
+                    del LQ_tile, output_tile_gpu, processed_tile_cpu, input_tile, tile_ready
+                    
+            del pipe, next_tile
+            if keep_model_loaded:
                 clean_vram()
-                
-            weight_sum_canvas[weight_sum_canvas == 0] = 1.0
-            final_output = final_output_canvas / weight_sum_canvas
+            else:
+                release_pipeline()
+            
+            # Uncovered pixels have a zero canvas value as well, so clamping keeps them at 0.
+            # 1e-8 underflows in fp16, so the weights are promoted before clamping.
+            weight_sum = weight_sum_canvas.float().clamp_min_(1e-8)
+            final_output = final_output_canvas.float().div_(weight_sum).permute(0, 2, 3, 1)
+            del final_output_canvas, weight_sum_canvas, weight_sum
         else:
             log("[FlashVSR] Preparing frames...")
-            LQ, th, tw, F = prepare_input_tensor(_frames, _device, scale=scale, dtype=dtype)
-            if "long" not in mode:
-                LQ = LQ.to(_device)
+            LQ, th, tw, F = prepare_input_tensor(_frames, _device, scale=scale, dtype=dtype, keep_on_device="long" not in mode)
             
-            pipe = init_pipeline(mode, _device, dtype)
+            pipe = get_pipeline(mode, _device, dtype)
             log(f"[FlashVSR] Processing {frames.shape[0]} frames...", message_type='info')
             
             video = pipe(
@@ -574,16 +807,13 @@ class FlashVSRNode:
             final_output = tensor2video(video).to('cpu')
             
             del pipe, video, LQ
-            clean_vram()
+            if keep_model_loaded:
+                clean_vram()
+            else:
+                release_pipeline()
         
         log("[FlashVSR] Done.", message_type='info')
-        if frames.shape[0] == 1:
-            final_output = final_output.to(_device)
-            stacked_image_tensor = torch.median(final_output, dim=0).unsqueeze(0).to('cpu')
-            del final_output
-            clean_vram()
-            return (stacked_image_tensor,)
-        
+        # A single input frame was replicated to 21 frames for the model; its result is the first one.
         return (final_output[:frames.shape[0], :, :, :],)
 
 NODE_CLASS_MAPPINGS = {